@@ -25,7 +25,6 @@ setup(
         "pandas>=1.5.3",
         "matplotlib>=3.7.1",
         "scikit-learn>=1.2.2",
-        "colorama>=0.4.6",
         "h5py>=3.8.0",
         "netCDF4>=1.6.3",
         "cartopy>=0.21.1"
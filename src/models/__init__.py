@@ -7,14 +7,10 @@ This package contains deep learning model architectures for climate model bias c
 - ConvLSTM: Spatiotemporal correction
 """
 
-from .unet import create_unet_model, custom_mse_loss
-from .bilstm import create_bilstm_model
-from .convlstm import create_convlstm_model, compile_model
+from .unet_model import create_unet_model, custom_mse_loss, compile_unet_model
 
 __all__ = [
     'create_unet_model',
     'custom_mse_loss',
-    'create_bilstm_model',
-    'create_convlstm_model',
-    'compile_model'
+    'compile_unet_model'
 ]
@@ -6,22 +6,31 @@ This module provides functions to create a U-Net architecture with:
 - Tanh activation for normalized ocean data
 - Dropout regularization
 - Custom MSE loss with ocean mask
+- Model loading and compilation shared by the training scripts
 """
 
 import tensorflow as tf
 from tensorflow import keras
 from tensorflow.keras import layers
 import numpy as np
+# resize_data used to be defined here and stays importable from this module
+from utils.preprocessing import channels_first, resize_data
 
 def create_unet_model(input_size=128):
     """Create U-Net model architecture.
     
+    The layout follows the Keras image data format. input_size must be
+    divisible by 32 for the five pooling steps, which also keeps every
+    convolution a multiple of 8 for Tensor Core kernels.
+    
     Args:
         input_size (int): Size of input images (square)
         
     Returns:
         keras.Model: Compiled U-Net model
     """
+    channel_axis = 1 if channels_first() else -1
+    
     def double_conv_block(x, n_filters):
         x = layers.Conv2D(n_filters, 3, padding="same", activation='tanh', kernel_initializer="he_normal")(x)
         x = layers.Conv2D(n_filters, 3, padding="same", activation='tanh', kernel_initializer="he_normal")(x)
@@ -35,13 +44,14 @@ def create_unet_model(input_size=128):
 
     def upsample_block(x, conv_features, n_filters):
         x = layers.Conv2DTranspose(n_filters, 3, 2, padding="same")(x)
-        x = layers.concatenate([x, conv_features])
+        x = layers.concatenate([x, conv_features], axis=channel_axis)
         x = layers.Dropout(0.2)(x)
         x = double_conv_block(x, n_filters)
         return x
 
     # Input layer
-    inputs = layers.Input(shape=(input_size, input_size, 1))
+    input_shape = (1, input_size, input_size) if channels_first() else (input_size, input_size, 1)
+    inputs = layers.Input(shape=input_shape)
     
     # Encoder
     f0, p0 = downsample_block(inputs, 32)
@@ -60,8 +70,8 @@ def create_unet_model(input_size=128):
     u9 = upsample_block(u8, f1, 64)
     u10 = upsample_block(u9, f0, 32)
     
-    # Output layer
-    outputs = layers.Conv2D(1, 1, padding="same")(u10)
+    # Output layer (kept in float32 so the loss stays stable under mixed precision)
+    outputs = layers.Conv2D(1, 1, padding="same", dtype="float32")(u10)
     
     return keras.Model(inputs, outputs, name="U-Net")
 
@@ -78,23 +88,48 @@ def custom_mse_loss(mask):
         function: Custom loss function
     """
     mask1 = tf.convert_to_tensor(mask.astype(np.float32))
-    mask = tf.image.resize(np.expand_dims(mask1, axis=-1), [128, 128]) 
+    # Regrid to the model grid and keep cells that are mostly ocean
+    mask = tf.image.resize(np.expand_dims(mask1, axis=-1), [128, 128]) >= 0.5
+    if channels_first():
+        mask = tf.transpose(mask, [2, 0, 1])
     
     def mse_loss(y_true, y_pred):
-        y_true = tf.multiply(y_true, mask)
-        y_pred = tf.multiply(y_pred, mask)
-        return tf.reduce_mean(tf.square(y_true - y_pred), axis=-1)
+        squared_error = tf.square(y_true - y_pred)
+        squared_error = tf.where(mask, squared_error, tf.zeros_like(squared_error))
+        return tf.reduce_mean(squared_error, axis=-1)
     
     return mse_loss
 
-def resize_data(data, target_size):
-    """Resize data to target dimensions.
+def compile_unet_model(mask, model_path=None, logger=print):
+    """Create the U-Net, or resume a saved one, and compile it for training.
     
     Args:
-        data (numpy.ndarray): Input data
-        target_size (int): Target size (square)
+        mask (numpy.ndarray): Binary ocean mask (1=ocean, 0=land)
+        model_path (str): Saved model to resume from if it can be loaded;
+            None always creates a new model
+        logger (callable): Function called with each progress message
         
     Returns:
-        tensorflow.Tensor: Resized data
+        keras.Model: Compiled U-Net model
     """
-    return tf.image.resize(data, [target_size, target_size])
+    model = None
+    if model_path is not None:
+        try:
+            logger('Attempting to load existing UNet model...')
+            model = keras.models.load_model(model_path, custom_objects={"mse_loss": custom_mse_loss(mask)})
+            logger('Loaded existing model')
+        except Exception as e:
+            logger(f'Creating new UNet model: {e}')
+    if model is None:
+        model = create_unet_model()
+    
+    optimizer = keras.optimizers.Adam(learning_rate=1e-4)
+    if keras.mixed_precision.global_policy().name == "mixed_float16":
+        # float16 needs loss scaling to avoid gradient underflow; bfloat16 does not
+        optimizer = keras.mixed_precision.LossScaleOptimizer(optimizer)
+    model.compile(
+        loss=custom_mse_loss(mask),
+        optimizer=optimizer,
+        metrics=["mae"]
+    )
+    return model
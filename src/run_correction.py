@@ -3,60 +3,259 @@
 
 import os
 import argparse
-import sys
-import numpy as np
-import tensorflow as tf
+import codecs
+import importlib
+import logging
+import logging.handlers
+import multiprocessing
+import multiprocessing.connection
+import selectors
+import signal
 import subprocess
+import sys
+import threading
 import time
-from colorama import Fore, Style, init
+import traceback
+
+from utils.training import PRECISION_POLICIES, configure_gpu_memory
 
-# Initialize colorama for colored console output
-init(autoreset=True)
+# TensorFlow, NumPy and SciPy are imported lazily so commands that do not
+# train or convert data start quickly; these TensorFlow settings must be in
+# place before that import happens
+os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+os.environ.setdefault("TF_ENABLE_ONEDNN_OPTS", "1")
+
+# ANSI colour codes for console output, disabled when not writing to a terminal
+if sys.stdout.isatty():
+    CYAN = "\x1b[36m"
+    YELLOW = "\x1b[33m"
+    GREEN = "\x1b[32m"
+    BLUE = "\x1b[34m"
+    RED = "\x1b[31m"
+    RESET = "\x1b[0m"
+else:
+    CYAN = YELLOW = GREEN = BLUE = RED = RESET = ""
 
 def print_header():
     """Print header for the climate model bias correction tool."""
     header = f"""
-{Fore.CYAN}============================================================
-{Fore.CYAN}||       GLOBAL CLIMATE MODEL ERROR CORRECTION TOOLKIT     ||
-{Fore.CYAN}============================================================{Style.RESET_ALL}
+{CYAN}============================================================
+{CYAN}||       GLOBAL CLIMATE MODEL ERROR CORRECTION TOOLKIT     ||
+{CYAN}============================================================{RESET}
     """
     print(header)
 
 def print_section(title):
     """Print a section title."""
-    print(f"\n{Fore.YELLOW}=== {title} ==={Style.RESET_ALL}\n")
+    print(f"\n{YELLOW}=== {title} ==={RESET}\n")
 
 def print_success(message):
     """Print a success message."""
-    print(f"{Fore.GREEN}✓ {message}{Style.RESET_ALL}")
+    print(f"{GREEN}✓ {message}{RESET}")
 
 def print_info(message):
     """Print an information message."""
-    print(f"{Fore.BLUE}ℹ {message}{Style.RESET_ALL}")
+    print(f"{BLUE}ℹ {message}{RESET}")
+
+def print_warning(message):
+    """Print a warning message."""
+    print(f"{YELLOW}! {message}{RESET}")
 
 def print_error(message):
     """Print an error message."""
-    print(f"{Fore.RED}✗ {message}{Style.RESET_ALL}")
+    print(f"{RED}✗ {message}{RESET}")
 
-def check_gpu_availability():
-    """Check if GPU is available for TensorFlow."""
+def check_gpu_availability(memory_limit=None, suggest_intel_build=True):
+    """Check if GPU is available for TensorFlow and configure it for training.
+    
+    This must run before TensorFlow allocates any tensors, as GPU memory
+    settings cannot be changed once the devices are initialised. Without a
+    GPU, suggest_intel_build points to --rebuild_tf_cpu if it would help.
+    """
+    import tensorflow as tf
+    
     gpus = tf.config.list_physical_devices('GPU')
     if gpus:
         print_success(f"Found {len(gpus)} GPU(s): {', '.join([gpu.name for gpu in gpus])}")
+        
+        # Allocate GPU memory on demand (or up to a fixed cap) instead of
+        # reserving the whole device up front
+        try:
+            configure_gpu_memory(memory_limit)
+            if memory_limit is not None:
+                print_info(f"GPU memory limited to {memory_limit} MB per device")
+        except RuntimeError as e:
+            print_error(f"Could not configure GPU memory: {str(e)}")
+        
+        # Let XLA compile clusters of the UNet graph into fused kernels
+        tf.config.optimizer.set_jit("autoclustering")
         # Get GPU details
+        supports_tf32 = False
         for gpu in gpus:
             try:
                 gpu_details = tf.config.experimental.get_device_details(gpu)
                 print_info(f"  - {gpu.name}: {gpu_details.get('device_name', 'Unknown')}")
+                compute_capability = gpu_details.get('compute_capability')
+                if compute_capability and compute_capability[0] >= 8:
+                    supports_tf32 = True
             except:
                 pass
+        
+        # TF32 lets float32 matmuls and convolutions run on Ampere+ Tensor Cores
+        if supports_tf32:
+            tf.config.experimental.enable_tensor_float_32_execution(True)
+            print_info("TensorFloat-32 execution enabled for float32 ops")
         return True
     else:
         print_info("No GPUs found. Training will run on CPU.")
+        if suggest_intel_build:
+            suggest_intel_tensorflow()
+        return False
+
+# Distributions that provide the stock tensorflow package
+STOCK_TENSORFLOW_DISTRIBUTIONS = ["tensorflow", "tensorflow-cpu", "tensorflow-gpu"]
+
+def installed_tensorflow_distributions():
+    """Return the installed version of each stock or Intel TensorFlow distribution."""
+    from importlib import metadata
+    
+    installed = {}
+    for distribution in STOCK_TENSORFLOW_DISTRIBUTIONS + ["intel-tensorflow"]:
+        try:
+            installed[distribution] = metadata.version(distribution)
+        except metadata.PackageNotFoundError:
+            pass
+    return installed
+
+def suggest_intel_tensorflow():
+    """Point to --rebuild_tf_cpu when the stock TensorFlow build is the one installed."""
+    installed = installed_tensorflow_distributions()
+    if "intel-tensorflow" not in installed and any(d in installed for d in STOCK_TENSORFLOW_DISTRIBUTIONS):
+        print_info("For faster CPU training, run with --rebuild_tf_cpu to install Intel's optimised TensorFlow")
+
+def run_pip(args):
+    """Run pip with the current interpreter, streaming its output."""
+    cmd = [sys.executable, "-m", "pip"] + args
+    print_info(f"Running: {' '.join(cmd)}")
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    return stream_process_output(process) == 0
+
+def install_intel_tensorflow():
+    """Replace the stock TensorFlow with the Intel-optimised build of the same version.
+    
+    Only meant for CPU-only machines: the Intel build has no GPU support, so
+    nothing is changed when a GPU is visible.
+    """
+    print_section("Installing Intel-optimised TensorFlow")
+    
+    installed = installed_tensorflow_distributions()
+    if "intel-tensorflow" in installed:
+        print_success(f"intel-tensorflow {installed['intel-tensorflow']} is already installed")
+        return True
+    stock = [d for d in STOCK_TENSORFLOW_DISTRIBUTIONS if d in installed]
+    if not stock:
+        print_error("TensorFlow is not installed")
+        return False
+    
+    import tensorflow as tf
+    
+    if tf.config.list_physical_devices('GPU'):
+        print_error("GPUs are available; intel-tensorflow is CPU-only and would replace the GPU build")
+        return False
+    
+    # intel-tensorflow is not published for every stock release, so make sure
+    # this version can be installed before removing anything
+    version = installed[stock[0]]
+    if not run_pip(["install", "--dry-run", "--no-deps", f"intel-tensorflow=={version}"]):
+        print_error(f"intel-tensorflow {version} is not available; keeping {', '.join(stock)}")
+        return False
+    
+    # Both builds install the same tensorflow package directory, so remove the
+    # stock build first rather than overlaying one on the other
+    if not run_pip(["uninstall", "-y"] + stock):
+        print_error(f"Could not uninstall {', '.join(stock)}")
+        return False
+    if not run_pip(["install", f"intel-tensorflow=={version}"]):
+        print_error("Installation of intel-tensorflow failed, restoring the stock build")
+        stock_requirements = [f"{d}=={installed[d]}" for d in stock]
+        if not run_pip(["install"] + stock_requirements):
+            print_error(f"Could not restore TensorFlow; reinstall with: pip install {' '.join(stock_requirements)}")
         return False
+    print_success(f"Replaced {', '.join(stock)} with intel-tensorflow {version}")
+    return True
+
+MASK_FILE = "../data/oras5_mask.mat"
 
-def check_data_availability(variable):
-    """Check if data files for the specified variable exist."""
+def mat_variable_key(file_name):
+    """Return the name of the array the training scripts read from a data .mat file."""
+    if file_name.endswith("_mean.mat"):
+        return "oras5_mclim"
+    if file_name.startswith("cmip6_"):
+        return "cmip6_ad_sten"
+    if file_name.startswith("oras5_"):
+        return "oras5_ad_sten"
+    return None
+
+def convert_mat_to_npy(mat_file, key):
+    """Write the named array from a .mat file to a sibling .npy file.
+    
+    The .npy copy can be memory-mapped by the training scripts instead of
+    decompressing the whole .mat file into memory on every run. Nothing is
+    written if an up-to-date copy already exists.
+    """
+    npy_file = os.path.splitext(mat_file)[0] + ".npy"
+    if os.path.exists(npy_file) and os.path.getmtime(npy_file) >= os.path.getmtime(mat_file):
+        return npy_file
+    
+    import numpy as np
+    import scipy.io
+    
+    contents = scipy.io.loadmat(mat_file, variable_names=[key])
+    if key not in contents:
+        raise ValueError(f"Variable {key} not found in {mat_file}")
+    
+    # MATLAB stores doubles, but the UNet trains in float32, so halve the
+    # bytes read per run. loadmat also returns MATLAB's column-major layout;
+    # store (time, lat, lon) in C order so each monthly field is one
+    # contiguous block.
+    data = np.ascontiguousarray(contents[key], dtype=np.float32)
+    if data.strides[-1] != data.itemsize:
+        raise ValueError(f"Unexpected memory layout for {mat_file}: strides {data.strides}")
+    
+    # Write to a temporary file first so an interrupted run leaves no partial copy
+    temp_file = npy_file + ".tmp"
+    with open(temp_file, "wb") as file:
+        np.save(file, data)
+    os.replace(temp_file, npy_file)
+    print_info(f"Converted {mat_file} to {npy_file}")
+    return npy_file
+
+def convert_mask_to_bitmap(mask_file):
+    """Write a bit-packed copy of the ocean mask next to its .mat file.
+    
+    The copy stores one bit per grid cell plus the grid shape, and is read
+    back by utils.data_loader.load_ocean_mask.
+    """
+    packed_file = os.path.splitext(mask_file)[0] + ".npz"
+    if os.path.exists(packed_file) and os.path.getmtime(packed_file) >= os.path.getmtime(mask_file):
+        return packed_file
+    
+    import numpy as np
+    import scipy.io
+    
+    mask = scipy.io.loadmat(mask_file)["mask1"] > 0
+    temp_file = packed_file + ".tmp"
+    with open(temp_file, "wb") as file:
+        np.savez(file, bits=np.packbits(mask), shape=np.array(mask.shape))
+    os.replace(temp_file, packed_file)
+    print_info(f"Converted {mask_file} to {packed_file}")
+    return packed_file
+
+def check_data_availability(variable, bias_mean_path=None):
+    """Check if data files for the specified variable exist.
+    
+    bias_mean_path replaces the variable's default climatology file.
+    """
     
     # Define required base directories based on the variable
     if variable == "sss":
@@ -76,6 +275,8 @@ def check_data_availability(variable):
     else:
         print_error(f"Unknown variable: {variable}")
         return False
+    if bias_mean_path is not None:
+        essential_files[-1] = bias_mean_path
     
     # Create directories if they don't exist
     required_dirs = [base_dir, "../output/", "../output/models/"]
@@ -84,17 +285,69 @@ def check_data_availability(variable):
             os.makedirs(directory)
             print_info(f"Created directory: {directory}")
     
-    # Check for missing files
-    missing_files = [f for f in essential_files if not os.path.exists(f)]
+    # List the data directory once instead of stat'ing each file, which is
+    # much cheaper on network filesystems
+    with os.scandir(base_dir) as entries:
+        present_files = {entry.name for entry in entries if entry.is_file()}
+    
+    # Check for missing files; a climatology given on the command line may
+    # live outside the data directory
+    def is_present(f):
+        if os.path.normpath(os.path.dirname(f)) == os.path.normpath(base_dir):
+            return os.path.basename(f) in present_files
+        return os.path.isfile(f)
+    missing_files = [f for f in essential_files if not is_present(f)]
     
     if missing_files:
         print_error("Missing required data files:")
         for f in missing_files:
             print(f"  - {f}")
         return False
-    else:
-        print_success(f"All required data files for {variable.upper()} are available")
-        return True
+    
+    # Catch unreadable or empty files now rather than when training loads them
+    unusable_files = []
+    file_sizes = {}
+    for f in essential_files:
+        # The file may vanish or become unreadable after the directory listing
+        try:
+            if not os.access(f, os.R_OK):
+                unusable_files.append(f"{f} (not readable)")
+                continue
+            file_sizes[f] = os.stat(f).st_size
+        except OSError as e:
+            unusable_files.append(f"{f} ({e.strerror or e})")
+            continue
+        if file_sizes[f] == 0:
+            unusable_files.append(f"{f} (empty)")
+    
+    if unusable_files:
+        print_error("Unusable required data files:")
+        for f in unusable_files:
+            print(f"  - {f}")
+        return False
+    
+    print_success(f"All required data files for {variable.upper()} are available")
+    for f in essential_files:
+        print(f"  - {f} ({file_sizes[f] / 1e9:.2f} GB)")
+    
+    # Convert the .mat files once so later runs can memory-map them. The
+    # training scripts fall back to reading the .mat files, so a failed
+    # conversion does not stop the run.
+    conversions = [(os.path.join(base_dir, file_name), mat_variable_key(file_name))
+                   for file_name in sorted(present_files) if file_name.endswith(".mat")]
+    for mat_file, key in conversions:
+        if key is None:
+            continue
+        try:
+            convert_mat_to_npy(mat_file, key)
+        except Exception as e:
+            print_warning(f"Could not convert {mat_file} to .npy, it will be read directly: {str(e)}")
+    if os.path.exists(MASK_FILE):
+        try:
+            convert_mask_to_bitmap(MASK_FILE)
+        except Exception as e:
+            print_warning(f"Could not convert {MASK_FILE} to a bitmap, it will be read directly: {str(e)}")
+    return True
 
 def list_variables():
     """List available variables for bias correction."""
@@ -106,102 +359,417 @@ def list_variables():
     }
     
     for idx, (var_code, var_name) in enumerate(variables.items(), 1):
-        print(f"{idx}. {Fore.CYAN}{var_code}{Style.RESET_ALL}: {var_name}")
+        print(f"{idx}. {CYAN}{var_code}{RESET}: {var_name}")
     
     return variables
 
-def run_correction(variable, epochs=None, batch_size=None, use_existing_model=False):
-    """Run the UNet correction method for the specified variable."""
-    print_section(f"Running UNet correction for {variable.upper()}")
+def set_precision_policy(precision):
+    """Set the global Keras precision policy used when building the UNet."""
+    import tensorflow as tf
     
-    # Determine the correct script to run based on the variable
-    if variable == "sss":
-        script_path = "./sss_unet_reorganised.py"
-    elif variable == "s200mavg":
-        script_path = "./so_200m_unet_reorganised.py"
-    else:
-        print_error(f"Unknown variable: {variable}")
-        return False
+    policy = PRECISION_POLICIES[precision]
+    tf.keras.mixed_precision.set_global_policy(policy)
+    print_info(f"Using Keras precision policy: {policy}")
+
+def stream_process_output(process):
+    """Print a child process's stdout and stderr as they arrive.
+    
+    Both pipes are read together, so error messages appear immediately and
+    a child writing heavily to one pipe cannot block on the other.
+    """
+    handlers = {process.stdout.fileno(): print, process.stderr.fileno(): print_error}
+    decoders = {fd: codecs.getincrementaldecoder("utf-8")(errors="replace") for fd in handlers}
+    partial_lines = {fd: "" for fd in handlers}
+    
+    selector = selectors.DefaultSelector()
+    try:
+        for fd in handlers:
+            selector.register(fd, selectors.EVENT_READ)
+        
+        while selector.get_map():
+            for key, _ in selector.select():
+                fd = key.fd
+                chunk = os.read(fd, 65536)
+                if not chunk:
+                    # End of stream: flush the decoder and any unterminated last line
+                    selector.unregister(fd)
+                    text = partial_lines[fd] + decoders[fd].decode(b"", final=True)
+                    if text:
+                        handlers[fd](text)
+                    continue
+                text = partial_lines[fd] + decoders[fd].decode(chunk)
+                *lines, partial_lines[fd] = text.split("\n")
+                for line in lines:
+                    handlers[fd](line.rstrip())
+    finally:
+        selector.close()
+        process.stdout.close()
+        process.stderr.close()
+    
+    return process.wait()
+
+def set_data_format(data_format):
+    """Set the Keras image data format used when building the UNet."""
+    import tensorflow as tf
     
-    # Check if script file exists
+    tf.keras.backend.set_image_data_format(data_format)
+    print_info(f"Using image data format: {data_format}")
+
+def run_correction_subprocess(variable, module_name, train_kwargs, precision="fp32", gpu_mem_limit=None,
+                              data_format="channels_last"):
+    """Run the UNet training script in a separate Python process."""
+    script_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), f"{module_name}.py")
     if not os.path.exists(script_path):
         print_error(f"Script file not found: {script_path}")
         return False
     
-    # Modify epochs, batch_size, and use_existing_model in the script if provided
-    if epochs is not None or batch_size is not None or use_existing_model:
+    # Pass the hyperparameters on the script's own command line
+    cmd = [sys.executable, script_path,
+           "--precision", precision,
+           "--data_format", data_format]
+    if "epochs" in train_kwargs:
+        cmd += ["--epochs", str(train_kwargs["epochs"])]
+    if "batch_size" in train_kwargs:
+        cmd += ["--batch_size", str(train_kwargs["batch_size"])]
+    if train_kwargs.get("use_existing_model"):
+        cmd.append("--load_model")
+    if "bias_mean_path" in train_kwargs:
+        cmd += ["--bias_mean_path", train_kwargs["bias_mean_path"]]
+    if gpu_mem_limit is not None:
+        cmd += ["--gpu_mem_limit", str(gpu_mem_limit)]
+    
+    # XLA is configured through the environment, as the script does not call
+    # check_gpu_availability; it sets up GPU memory itself
+    env = dict(os.environ)
+    env.setdefault("TF_XLA_FLAGS", "--tf_xla_auto_jit=2")
+    # Flush the child's output immediately and, unless the user chose a level,
+    # keep TensorFlow's C++ logging quiet
+    env["PYTHONUNBUFFERED"] = "1"
+    env.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+    
+    try:
+        start_time = time.time()
+        print_info(f"Starting training with {module_name} in a subprocess")
+        # Start the child in its own process group so it can be stopped as a whole
+        process = subprocess.Popen(cmd,
+                                   stdout=subprocess.PIPE,
+                                   stderr=subprocess.PIPE,
+                                   env=env,
+                                   start_new_session=True)
+        # The child is in its own session, so signals sent to this process
+        # no longer reach it; turn them into an exit that runs the cleanup below
+        def exit_on_signal(signum, frame):
+            raise SystemExit(128 + signum)
+        previous_handlers = {sig: signal.signal(sig, exit_on_signal) for sig in (signal.SIGTERM, signal.SIGHUP)}
         try:
-            with open(script_path, 'r') as file:
-                script_contents = file.read()
-            
-            # Replace epochs value if provided
-            if epochs is not None:
-                script_contents = script_contents.replace("epochs=500", f"epochs={epochs}")
-                script_contents = script_contents.replace("epochs=1000", f"epochs={epochs}")
-                script_contents = script_contents.replace("epochs=2000", f"epochs={epochs}")
-            
-            # Replace batch_size value if provided
-            if batch_size is not None:
-                script_contents = script_contents.replace("batch_size=32", f"batch_size={batch_size}")
-                script_contents = script_contents.replace("batch_size=64", f"batch_size={batch_size}")
-            
-            # Modify to use existing model if required
-            if use_existing_model:
-                # For UNet, add model loading before the create_model call
-                model_creation_line = "model = create_unet_model()"
-                var_folder = "sss" if variable == "sss" else "so_200m"
-                model_loading_code = f"""try:
-    print('Attempting to load existing UNet model...')
-    model = keras.models.load_model('../output/models/unet_{var_folder}_model.h5', custom_objects={{"mse_loss": custom_mse_loss(mask)}})
-    print('Loaded existing model')
-except Exception as e:
-    print('Creating new UNet model:', e)
-    model = create_unet_model()"""
-                script_contents = script_contents.replace(model_creation_line, model_loading_code)
-            
-            # Write modified content to a temporary file
-            temp_script_path = f"./temp_{variable}_unet.py"
-            with open(temp_script_path, 'w') as file:
-                file.write(script_contents)
-            
-            script_path = temp_script_path
-            
-        except Exception as e:
-            print_error(f"Error modifying script parameters: {str(e)}")
-            return False
+            return_code = stream_process_output(process)
+        finally:
+            for sig, handler in previous_handlers.items():
+                signal.signal(sig, handler)
+            # If we are leaving early (Ctrl-C, SIGTERM, SIGHUP), stop the whole
+            # group so no orphaned process keeps holding GPU memory
+            if process.poll() is None:
+                print_error("Interrupted, stopping training process")
+                os.killpg(process.pid, signal.SIGTERM)
+                process.wait()
+        elapsed_time = time.time() - start_time
+    except Exception as e:
+        print_error(f"Error running {module_name}: {str(e)}")
+        return False
+    
+    if return_code == 0:
+        print_success(f"{variable.upper()} correction completed successfully in {elapsed_time:.2f} seconds")
+        return True
+    else:
+        print_error(f"{variable.upper()} correction failed with return code {return_code}")
+        return False
+
+TRAINING_MODULES = {
+    "sss": "sss_unet_reorganised",
+    "s200mavg": "so_200m_unet_reorganised"
+}
+
+def build_train_kwargs(epochs=None, batch_size=None, use_existing_model=False, bias_mean_path=None):
+    """Collect the train() arguments, leaving out those not explicitly provided."""
+    train_kwargs = {"use_existing_model": use_existing_model}
+    if epochs is not None:
+        train_kwargs["epochs"] = epochs
+    if batch_size is not None:
+        train_kwargs["batch_size"] = batch_size
+    if bias_mean_path is not None:
+        train_kwargs["bias_mean_path"] = bias_mean_path
+    return train_kwargs
+
+def run_correction(variable, epochs=None, batch_size=None, use_existing_model=False, precision="fp32",
+                   use_subprocess=False, gpu_mem_limit=None, data_format="channels_last",
+                   bias_mean_path=None):
+    """Run the UNet correction method for the specified variable."""
+    print_section(f"Running UNet correction for {variable.upper()}")
+    
+    # Determine the correct training module based on the variable
+    if variable not in TRAINING_MODULES:
+        print_error(f"Unknown variable: {variable}")
+        return False
+    module_name = TRAINING_MODULES[variable]
+    train_kwargs = build_train_kwargs(epochs, batch_size, use_existing_model, bias_mean_path)
+    
+    if use_subprocess:
+        return run_correction_subprocess(variable, module_name, train_kwargs, precision, gpu_mem_limit,
+                                         data_format)
+    
+    # The policy and data format must be in place before the model layers are created
+    set_precision_policy(precision)
+    set_data_format(data_format)
     
-    # Run the script
+    try:
+        training_module = importlib.import_module(module_name)
+    except ImportError as e:
+        print_error(f"Could not import training module {module_name}: {str(e)}")
+        return False
+    
+    # Run the training in-process
     try:
         start_time = time.time()
-        print_info(f"Starting execution of {script_path}")
-        process = subprocess.Popen([sys.executable, script_path], 
-                                   stdout=subprocess.PIPE, 
-                                   stderr=subprocess.PIPE, 
-                                   universal_newlines=True)
-        
-        # Print output in real-time
-        for stdout_line in iter(process.stdout.readline, ""):
-            print(stdout_line.strip())
-        process.stdout.close()
-        
-        # Handle errors
-        for stderr_line in iter(process.stderr.readline, ""):
-            print_error(stderr_line.strip())
-        process.stderr.close()
-        
-        return_code = process.wait()
-        end_time = time.time()
-        
-        # Clean up temporary file if created
-        if epochs is not None or batch_size is not None or use_existing_model:
-            try:
-                os.remove(temp_script_path)
-            except:
-                pass
-        
-        if return_code == 0:
-            elapsed_time = end_time - start_time
-            print_success(f"{variable.upper()} correction completed successfully in {elapsed_time:.2f} seconds")
-            return True
+        print_info(f"Starting training with {module_name}")
+        training_module.train(logger=print_info, **train_kwargs)
+        elapsed_time = time.time() - start_time
+    except Exception as e:
+        print_error(f"{variable.upper()} correction failed: {str(e)}")
+        print_error(traceback.format_exc())
+        return False
+    
+    print_success(f"{variable.upper()} correction completed successfully in {elapsed_time:.2f} seconds")
+    return True
+
+class LogWriter:
+    """File-like object that sends each complete line written to it to a log function."""
+    
+    def __init__(self, log):
+        self.log = log
+        self.partial_line = ""
+    
+    def write(self, text):
+        *lines, self.partial_line = (self.partial_line + text).split("\n")
+        for line in lines:
+            if line.strip():
+                self.log(line.rstrip())
+        return len(text)
+    
+    def flush(self):
+        pass
+    
+    def isatty(self):
+        return False
+
+def redirect_stderr_to_log(log):
+    """Send everything written to standard error to a log function.
+    
+    File descriptor 2 is replaced by a pipe read from a background thread, so
+    this also covers TensorFlow's C++ logging, which bypasses sys.stderr.
+    """
+    read_fd, write_fd = os.pipe()
+    os.dup2(write_fd, 2)
+    os.close(write_fd)
+    
+    def forward_lines():
+        with open(read_fd, encoding="utf-8", errors="replace") as pipe:
+            for line in pipe:
+                if line.strip():
+                    log(line.rstrip())
+    
+    threading.Thread(target=forward_lines, daemon=True).start()
+    sys.stderr = LogWriter(log)
+
+def train_worker(variable, gpu_index, log_queue, train_kwargs, precision, gpu_mem_limit, data_format):
+    """Train one variable in a worker process started by run_concurrent_corrections."""
+    logger = logging.getLogger(variable)
+    logger.setLevel(logging.INFO)
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    logger.propagate = False
+    
+    # Route everything printed in this worker, including the print_* helpers,
+    # Keras progress lines and TensorFlow warnings, through the shared log queue
+    sys.stdout = LogWriter(logger.info)
+    redirect_stderr_to_log(logger.warning)
+    
+    import tensorflow as tf
+    
+    # Bind this worker to its own GPU before TensorFlow initialises the devices
+    if gpu_index is not None:
+        gpus = tf.config.list_physical_devices('GPU')
+        tf.config.set_visible_devices(gpus[gpu_index], 'GPU')
+        logger.info(f"Using GPU {gpu_index}")
+    check_gpu_availability(memory_limit=gpu_mem_limit, suggest_intel_build=False)
+    set_precision_policy(precision)
+    set_data_format(data_format)
+    
+    try:
+        training_module = importlib.import_module(TRAINING_MODULES[variable])
+        training_module.train(logger=logger.info, verbose=2, **train_kwargs)
+    except Exception as e:
+        logger.exception(f"{variable.upper()} correction failed: {str(e)}")
+        sys.exit(1)
+
+def run_concurrent_corrections(variables, epochs=None, batch_size=None, use_existing_model=False, precision="fp32",
+                               gpu_mem_limit=None, data_format="channels_last", bias_mean_path=None):
+    """Train several variables at once, one process per variable.
+    
+    Each process gets its own GPU when there are enough of them; otherwise
+    they share the visible GPUs. Log messages from all processes are
+    forwarded through a queue and printed by this process.
+    """
+    import tensorflow as tf
+    
+    print_section(f"Running UNet correction for {', '.join(v.upper() for v in variables)}")
+    
+    train_kwargs = build_train_kwargs(epochs, batch_size, use_existing_model, bias_mean_path)
+    gpu_count = len(tf.config.list_physical_devices('GPU'))
+    if gpu_count == 0:
+        suggest_intel_tensorflow()
+    
+    # TensorFlow is not fork-safe, so start the workers from a fresh interpreter
+    context = multiprocessing.get_context("spawn")
+    log_queue = context.Queue()
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("[%(name)s] %(message)s"))
+    listener = logging.handlers.QueueListener(log_queue, handler)
+    listener.start()
+    
+    start_time = time.time()
+    processes = []
+    for idx, variable in enumerate(variables):
+        gpu_index = idx if gpu_count >= len(variables) else None
+        process = context.Process(target=train_worker, name=variable,
+                                  args=(variable, gpu_index, log_queue, train_kwargs,
+                                        precision, gpu_mem_limit, data_format))
+        process.start()
+        processes.append(process)
+    
+    # Wait for whichever worker finishes next, so each one's time is its own
+    elapsed_times = {}
+    try:
+        pending = {process.sentinel: process for process in processes}
+        while pending:
+            for sentinel in multiprocessing.connection.wait(list(pending)):
+                process = pending.pop(sentinel)
+                process.join()
+                elapsed_times[process.name] = time.time() - start_time
+    finally:
+        listener.stop()
+    
+    success = True
+    for process in processes:
+        if process.exitcode == 0:
+            print_success(f"{process.name.upper()} correction completed successfully "
+                          f"in {elapsed_times[process.name]:.2f} seconds")
         else:
-            print_error(f"{variable.upper()} correction failed with return code {return_code}")
\ No newline at end of file
+            print_error(f"{process.name.upper()} correction failed with exit code {process.exitcode}")
+            success = False
+    return success
+
+def prompt_for_options():
+    """Interactively ask for the variable and training options."""
+    variables = list_variables()
+    choice = input(f"\nSelect a variable (1-{len(variables)} or code): ").strip()
+    codes = list(variables)
+    if choice.isdigit() and 1 <= int(choice) <= len(codes):
+        variable = codes[int(choice) - 1]
+    elif choice in variables:
+        variable = choice
+    else:
+        print_error(f"Invalid selection: {choice}")
+        return None
+    
+    load_model = input("Load an existing model if available? [y/N]: ").strip().lower() == "y"
+    epochs = input("Number of epochs (leave blank for script default): ").strip()
+    batch_size = input("Batch size (leave blank for script default): ").strip()
+    
+    return {
+        "variable": variable,
+        "epochs": int(epochs) if epochs else None,
+        "batch_size": int(batch_size) if batch_size else None,
+        "use_existing_model": load_model,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Global climate model error correction toolkit")
+    parser.add_argument("--variable", choices=list(TRAINING_MODULES) + ["all"],
+                        help="Variable to correct, or 'all' to train every variable concurrently "
+                             "(prompted for if omitted)")
+    parser.add_argument("--epochs", type=int, default=None,
+                        help="Number of training epochs")
+    parser.add_argument("--batch_size", type=int, default=None,
+                        help="Training batch size")
+    parser.add_argument("--load_model", action="store_true",
+                        help="Resume from an existing saved model if available")
+    parser.add_argument("--bias_mean_path", default=None,
+                        help="ORAS5 climatology .mat file to remove before training (default: per variable)")
+    parser.add_argument("--precision", choices=list(PRECISION_POLICIES), default="fp32",
+                        help="Training precision; mixed_bf16 needs Ampere+ GPUs or TPUs")
+    parser.add_argument("--data_format", choices=["channels_last", "channels_first"], default="channels_last",
+                        help="Image tensor layout; channels_first only helps on CPU with oneDNN")
+    parser.add_argument("--gpu_mem_limit", type=int, default=None,
+                        help="Cap GPU memory per device in MB (default: grow on demand)")
+    parser.add_argument("--subprocess", action="store_true",
+                        help="Train in a separate Python process instead of in-process")
+    parser.add_argument("--rebuild_tf_cpu", action="store_true",
+                        help="Replace TensorFlow with Intel's oneDNN-optimised build on CPU-only machines and exit")
+    parser.add_argument("--list_variables", action="store_true",
+                        help="List the available variables and exit")
+    parser.add_argument("--check_data", action="store_true",
+                        help="Only check that the input data is available")
+    args = parser.parse_args()
+    
+    print_header()
+    
+    if args.rebuild_tf_cpu:
+        return 0 if install_intel_tensorflow() else 1
+    
+    if args.list_variables:
+        list_variables()
+        return 0
+    
+    if args.variable is None:
+        options = prompt_for_options()
+        if options is None:
+            return 1
+    else:
+        options = {
+            "variable": args.variable,
+            "epochs": args.epochs,
+            "batch_size": args.batch_size,
+            "use_existing_model": args.load_model,
+        }
+    variable = options.pop("variable")
+    variables = list(TRAINING_MODULES) if variable == "all" else [variable]
+    if len(variables) > 1 and args.bias_mean_path is not None:
+        print_error("--bias_mean_path cannot be combined with --variable all")
+        return 1
+    if len(variables) > 1 and args.subprocess:
+        print_error("--subprocess cannot be combined with --variable all")
+        return 1
+    
+    print_section("Checking Data")
+    if not all([check_data_availability(v, args.bias_mean_path) for v in variables]):
+        return 1
+    if args.check_data:
+        return 0
+    
+    # Each worker process configures its own GPU
+    if len(variables) > 1:
+        return 0 if run_concurrent_corrections(variables, precision=args.precision,
+                                               gpu_mem_limit=args.gpu_mem_limit, data_format=args.data_format,
+                                               **options) else 1
+    
+    # GPU memory must be configured before TensorFlow touches the devices;
+    # in subprocess mode the child process does this itself
+    if not args.subprocess:
+        print_section("Checking Hardware")
+        check_gpu_availability(memory_limit=args.gpu_mem_limit)
+    
+    return 0 if run_correction(variable, precision=args.precision, use_subprocess=args.subprocess,
+                               gpu_mem_limit=args.gpu_mem_limit, data_format=args.data_format,
+                               bias_mean_path=args.bias_mean_path, **options) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
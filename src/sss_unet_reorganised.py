@@ -1,7 +1,20 @@
-""""
+# %%
+import os
+import scipy.io
+import sys
+import numpy as np
+import scipy
+import tensorflow as tf
+import time
+import datetime
+import pandas as pd
+import matplotlib.pyplot as plt
+from utils.data_loader import load_mat_array, load_ocean_mask
+from utils.preprocessing import channels_first, data_minus_mean, data_plus_mean, resize_data
+from utils.training import make_dataset, run_training_script
+from models.unet_model import compile_unet_model
 
-"""
-def load_cmip6_sss_data(base_path='../data/sss/'):
+def load_cmip6_sss_data(base_path='../data/sss/', logger=print):
     """
     Load and process CMIP6 sst (sea surface height) data from multiple scenarios.
     
@@ -9,6 +22,8 @@ def load_cmip6_sss_data(base_path='../data/sss/'):
     -----------
     base_path : str
         Base directory path where the .mat files are stored
+    logger : callable
+        Function called with each progress message
         
     Returns:
     --------
@@ -18,7 +33,7 @@ def load_cmip6_sss_data(base_path='../data/sss/'):
     
     # Load historical data (1958-2014)
     historical_file = f'{base_path}cmip6_sss_1958_2014_fill_diststen.mat'
-    cmip6_historical = np.array(scipy.io.loadmat(historical_file)['cmip6_ad_sten'])
+    cmip6_historical = load_mat_array(historical_file, 'cmip6_ad_sten')
     
     # Dictionary of SSP scenarios
     ssp_scenarios = ['ssp126', 'ssp245', 'ssp370', 'ssp585']
@@ -28,12 +43,12 @@ def load_cmip6_sss_data(base_path='../data/sss/'):
     for scenario in ssp_scenarios:
         # Load scenario data
         scenario_file = f'{base_path}cmip6_sss_{scenario}_2015_2022_fill_diststen.mat'
-        scenario_data = np.array(scipy.io.loadmat(scenario_file)['cmip6_ad_sten'])
+        scenario_data = load_mat_array(scenario_file, 'cmip6_ad_sten')
         
         # Trim to first 72 timesteps
         ssp_data[scenario] = scenario_data[0:72, :, :]
         
-        print(f'Loaded {scenario}: Shape = {ssp_data[scenario].shape}')
+        logger(f'Loaded {scenario}: Shape = {ssp_data[scenario].shape}')
     
     # Concatenate all data
     concatenated_data = np.concatenate(
@@ -41,13 +56,11 @@ def load_cmip6_sss_data(base_path='../data/sss/'):
         axis=0
     )
     
-    print(f'Final concatenated shape: {concatenated_data.shape}')
+    logger(f'Final concatenated shape: {concatenated_data.shape}')
     
     return concatenated_data
-import numpy as np
-import scipy.io
 
-def load_oras5_sss_data(base_path='../data/sss/'):
+def load_oras5_sss_data(base_path='../data/sss/', logger=print):
     """
     Load and process ORAS5 sst (sea surface height) data, including historical data
     and future projections with repetition.
@@ -56,6 +69,8 @@ def load_oras5_sss_data(base_path='../data/sss/'):
     -----------
     base_path : str
         Base directory path where the .mat files are stored
+    logger : callable
+        Function called with each progress message
         
     Returns:
     --------
@@ -65,15 +80,15 @@ def load_oras5_sss_data(base_path='../data/sss/'):
     
     # Load historical data (1958-2014)
     historical_file = f'{base_path}oras5_sss_1958_2014_fill_diststen.mat'
-    oras5_historical = np.array(scipy.io.loadmat(historical_file)['oras5_ad_sten'])
+    oras5_historical = load_mat_array(historical_file, 'oras5_ad_sten')
     
     # Load future data (2015-2022)
     future_file = f'{base_path}oras5_sss_2015_2022_fill_diststen.mat'
-    oras5_future = np.array(scipy.io.loadmat(future_file)['oras5_ad_sten'])
+    oras5_future = load_mat_array(future_file, 'oras5_ad_sten')
     
     # Trim future data to first 72 timesteps
     oras5_future_trimmed = oras5_future[0:72, :, :]
-    print(f'Future data shape after trimming: {oras5_future_trimmed.shape}')
+    logger(f'Future data shape after trimming: {oras5_future_trimmed.shape}')
     
     # Concatenate historical data with 4 repetitions of future data
     # This matches the structure of having data for 4 different SSP scenarios
@@ -82,155 +97,89 @@ def load_oras5_sss_data(base_path='../data/sss/'):
         axis=0
     )
     
-    print(f'Final concatenated shape: {concatenated_data.shape}')
+    logger(f'Final concatenated shape: {concatenated_data.shape}')
     
     return concatenated_data
-def data_minus_mean(data):
-    oras5_mean1=np.array(scipy.io.loadmat('../data/sss/oras5_historical_sss_1958_2020_mean.mat')['oras5_mclim'])
-    num=np.size(np.squeeze(data[:,1,1]))
-    num=num/12
-    print(num)
-    oras5_mean=np.repeat(oras5_mean1,num,0)
-    data=data-oras5_mean
-    return data
-
-def data_plus_mean(data):
-    oras5_mean1=np.array(scipy.io.loadmat('../data/sss/oras5_historical_sss_1958_2020_mean.mat')['oras5_mclim'])
-    num=np.size(np.squeeze(data[:,1,1]))
-    num=num/12
-    print(num)
-    oras5_mean=np.repeat(oras5_mean1,num,0)
-    data=data+oras5_mean
-    return data
-def resize_data(data, target_size):
-    """Resize data to target dimensions."""
-    return tf.image.resize(data, [target_size, target_size])
-
-def create_unet_model(input_size=128):
-    """Create U-Net model architecture."""
-    def double_conv_block(x, n_filters):
-        x = layers.Conv2D(n_filters, 3, padding="same", activation='tanh', kernel_initializer="he_normal")(x)
-        x = layers.Conv2D(n_filters, 3, padding="same", activation='tanh', kernel_initializer="he_normal")(x)
-        return x
-
-    def downsample_block(x, n_filters):
-        f = double_conv_block(x, n_filters)
-        p = layers.MaxPool2D(2)(f)
-        p = layers.Dropout(0.2)(p)
-        return f, p
-
-    def upsample_block(x, conv_features, n_filters):
-        x = layers.Conv2DTranspose(n_filters, 3, 2, padding="same")(x)
-        x = layers.concatenate([x, conv_features])
-        x = layers.Dropout(0.2)(x)
-        x = double_conv_block(x, n_filters)
-        return x
-
-    inputs = layers.Input(shape=(input_size, input_size, 1))
-    
-    # Encoder
-    f0, p0 = downsample_block(inputs, 32)
-    f1, p1 = downsample_block(p0, 64)
-    f2, p2 = downsample_block(p1, 128)
-    f3, p3 = downsample_block(p2, 256)
-    f4, p4 = downsample_block(p3, 512)
-    
-    # Bottleneck
-    bottleneck = double_conv_block(p4, 1024)
-    
-    # Decoder
-    u6 = upsample_block(bottleneck, f4, 512)
-    u7 = upsample_block(u6, f3, 256)
-    u8 = upsample_block(u7, f2, 128)
-    u9 = upsample_block(u8, f1, 64)
-    u10 = upsample_block(u9, f0, 32)
-    
-    outputs = layers.Conv2D(1, 1, padding="same")(u10)
-    
-    return keras.Model(inputs, outputs, name="U-Net")
-def custom_mse_loss(mask):
-    """Create custom MSE loss function with mask."""
-    mask1=tf.convert_to_tensor(mask.astype(np.float32))
-    mask = tf.image.resize(np.expand_dims(mask1, axis = -1), [128,128]) 
-    def mse_loss(y_true, y_pred):
-        y_true = tf.multiply(y_true, mask)
-        y_pred = tf.multiply(y_pred, mask)
-        return tf.reduce_mean(tf.square(y_true - y_pred), axis=-1)
-    return mse_loss
-
-def process_ssp_scenario_2023(scenario, model, input_path_template, output_path_template, pix_size, final_size):
+def process_ssp_scenario_2023(scenario, model, input_path_template, output_path_template, pix_size, final_size, mean_data,
+                              logger=print, verbose=1):
     """ """
     input_path = input_path_template.format(scenario=scenario)
     output_path = output_path_template.format(scenario=scenario)
     target_size=128
     # Load and preprocess data
-    cmip6_data = np.array(scipy.io.loadmat(input_path)['cmip6_ad_sten'])
-    oras5_mean1=np.array(scipy.io.loadmat('../data/sss/oras5_historical_sss_1958_2020_mean.mat')['oras5_mclim'])
-    num=np.size(np.squeeze(cmip6_data[:,1,1]))
-    num=num/12
-    oras5_mean=np.repeat(oras5_mean1,num,0)
-    cmip6_data_processed=cmip6_data-oras5_mean
+    cmip6_data = load_mat_array(input_path, 'cmip6_ad_sten')
+    cmip6_data_processed=data_minus_mean(cmip6_data, mean_data)
     cmip6_data_expanded = np.expand_dims(cmip6_data_processed, axis=-1)
-    cmip6_data_resized=tf.image.resize(cmip6_data_expanded, [target_size, target_size])
+    cmip6_data_resized=resize_data(cmip6_data_expanded, target_size)
     
-    print(f"Input shape for scenario {scenario}: {cmip6_data_resized.shape}")
+    logger(f"Input shape for scenario {scenario}: {cmip6_data_resized.shape}")
     
     # Predict using the model
-    x_hat = model.predict(cmip6_data_resized)
+    x_hat = model.predict(cmip6_data_resized, verbose=verbose)
+    if channels_first():
+        x_hat = np.transpose(x_hat, [0, 2, 3, 1])
     x_hat_resized=tf.image.resize(x_hat, [85, 85])
-    print(x_hat_resized.shape)
+    logger(f"{x_hat_resized.shape}")
      # Postprocess and save results
-    unet_out = np.squeeze(x_hat_resized)+oras5_mean
-    print(f"Output shape for scenario {scenario}: {x_hat_resized.shape}")
+    unet_out = data_plus_mean(np.squeeze(x_hat_resized), mean_data)
+    logger(f"Output shape for scenario {scenario}: {x_hat_resized.shape}")
     np.save(output_path, unet_out)
-    print(f"Saved output for {scenario} to {output_path}")
+    logger(f"Saved output for {scenario} to {output_path}")
+
+BIAS_MEAN_PATH = '../data/sss/oras5_historical_sss_1958_2020_mean.mat'
 
-def main():
-    import os
-    import scipy.io
-    import sys
-    import numpy as np
-    import scipy
-    import tensorflow as tf
-    from tensorflow import keras
-    from tensorflow.keras import layers
-    import time
-    import datetime
-    import pandas as pd
-    from scipy.interpolate import interp2d
-    import matplotlib.pyplot as plt
+def train(epochs=2000, batch_size=64, use_existing_model=False, logger=print,
+          bias_mean_path=BIAS_MEAN_PATH, verbose=1):
+    """Train the UNet and write bias-corrected SSP projections.
 
+    Parameters:
+    -----------
+    epochs : int
+        Number of training epochs
+    batch_size : int
+        Training batch size
+    use_existing_model : bool
+        Resume from the saved model in ../output/models/ if it can be loaded
+    logger : callable
+        Function called with each progress message
+    bias_mean_path : str
+        .mat file with the ORAS5 monthly climatology removed before training
+    verbose : int
+        Keras progress output for fit() and predict(); 2 prints one line
+        per epoch, which suits logging from concurrent runs
+    """
     tf.keras.utils.set_random_seed(89)
     
-    # Configure GPU if available
-    gpus = tf.config.list_physical_devices('GPU')
+    # Configure GPU if available, keeping any device binding made by the caller
+    gpus = tf.config.get_visible_devices('GPU')
     if gpus:
         try:
             tf.config.set_visible_devices(gpus[0], 'GPU')
             logical_gpus = tf.config.list_logical_devices('GPU')
-            print(f"{len(gpus)} Physical GPU, {len(logical_gpus)} Logical GPUs")
+            logger(f"{len(gpus)} Physical GPU, {len(logical_gpus)} Logical GPUs")
         except RuntimeError as e:
-            print(e)
+            logger(str(e))
     # load cmip6 data
-    cmip6_data = load_cmip6_sss_data()
+    cmip6_data = load_cmip6_sss_data(logger=logger)
     # load ORAS5 data
-    oras5_data = load_oras5_sss_data()
-    # remove mean
-    cmip6_data1=data_minus_mean(cmip6_data)
-    print(cmip6_data1.shape)
-    oras5_data1=data_minus_mean(oras5_data)
-    print(oras5_data1.shape)
+    oras5_data = load_oras5_sss_data(logger=logger)
+    # remove mean, loading the climatology once for training and prediction
+    oras5_mean=load_mat_array(bias_mean_path, 'oras5_mclim')
+    cmip6_data1=data_minus_mean(cmip6_data, oras5_mean)
+    logger(f"{cmip6_data1.shape}")
+    oras5_data1=data_minus_mean(oras5_data, oras5_mean)
+    logger(f"{oras5_data1.shape}")
 
     # preprocess data
     cmip6_sss=np.expand_dims(cmip6_data1, axis = -1)
     oras5_data1=np.expand_dims(oras5_data1, axis = -1)
 
-    print(cmip6_sss.shape)
+    logger(f"{cmip6_sss.shape}")
 
     # %%
     cmip6_sss=cmip6_sss.astype(np.float32)
     oras5_sss_ssp=oras5_data1.astype(np.float32)
-    print(cmip6_sss.shape)
+    logger(f"{cmip6_sss.shape}")
     #%%
     # mask=np.load('../mask_cmip6.npy')
     # print(mask.shape)
@@ -239,17 +188,17 @@ def main():
     from sklearn.model_selection import train_test_split
     # np.random
     X_train1, X_test1, y_train, y_test = train_test_split(cmip6_sss, oras5_sss_ssp, train_size=0.87654321, shuffle=True)
-    print(X_train1.shape, X_test1.shape)
-    print(y_train.shape, y_test.shape)
+    logger(f"{X_train1.shape} {X_test1.shape}")
+    logger(f"{y_train.shape} {y_test.shape}")
 
-    print(X_train1.shape, X_test1.shape)
-    print(y_train.shape, y_test.shape)
-    np.save('cmip6_train.npy',X_train1)
-    np.save('oras5_train.npy',y_train)
+    logger(f"{X_train1.shape} {X_test1.shape}")
+    logger(f"{y_train.shape} {y_test.shape}")
+    np.save('cmip6_sss_train.npy',X_train1)
+    np.save('oras5_sss_train.npy',y_train)
 
-    np.save('cmip6_test.npy',X_test1)
+    np.save('cmip6_sss_test.npy',X_test1)
 
-    np.save('oras5_test.npy',y_test)
+    np.save('oras5_sss_test.npy',y_test)
 
     # %%
     pix_size=128
@@ -258,30 +207,25 @@ def main():
     y_train =resize_data(y_train, pix_size)
 
     X_test1 = resize_data(X_test1, pix_size)
-    y_test = resize_data(X_test1, pix_size)
-    print(X_train1.shape, X_test1.shape)
-    print(y_train.shape, y_test.shape)
+    y_test = resize_data(y_test, pix_size)
+    logger(f"{X_train1.shape} {X_test1.shape}")
+    logger(f"{y_train.shape} {y_test.shape}")
 
-    print(X_train1.shape, X_test1.shape)
-    print(y_train.shape, y_test.shape)
+    logger(f"{X_train1.shape} {X_test1.shape}")
+    logger(f"{y_train.shape} {y_test.shape}")
 
      # Create and compile model
-    model = create_unet_model()
-    optimizer = keras.optimizers.Adam(learning_rate=1e-4)
-    mask=np.array(scipy.io.loadmat('../data/oras5_mask.mat')['mask1'])
-    model.compile(
-        loss=custom_mse_loss(mask),
-        optimizer=optimizer,
-        metrics=["mae"]
-    )
+    mask=load_ocean_mask('../data/oras5_mask.mat')
+    model_path = '../output/models/unet_sss_model.h5' if use_existing_model else None
+    model = compile_unet_model(mask, model_path, logger=logger)
+    train_ds = make_dataset(X_train1, y_train, batch_size)
+    val_ds = make_dataset(X_test1, y_test, batch_size)
     # train model
     history = model.fit(
-    x               = X_train1,
-    y               = y_train,
-    batch_size      = 64,
-    epochs          = 2000,
-    validation_data=(X_test1,y_test),
-    shuffle         = False)
+    train_ds,
+    epochs          = epochs,
+    validation_data = val_ds,
+    verbose         = verbose)
 
     # Save training history
     hist_df = pd.DataFrame(history.history)
@@ -308,7 +252,8 @@ def main():
     pix_size = 128  # Replace with the actual pixel size for resizing
     final_size = 85  # Replace with the final size after resizing
     for scenario in scenarios:
-        process_ssp_scenario_2023(scenario, model, input_path_template, output_path_template, pix_size, final_size)
+        process_ssp_scenario_2023(scenario, model, input_path_template, output_path_template, pix_size, final_size, oras5_mean,
+                                  logger=logger, verbose=verbose)
 
     scenarios = ['ssp126', 'ssp245', 'ssp370', 'ssp585']
     input_path_template = '../data/sss/cmip6_sss_{scenario}_2015_2022_fill_diststen.mat'
@@ -316,8 +261,9 @@ def main():
     pix_size = 128  # Replace with the actual pixel size for resizing
     final_size = 85  # Replace with the final size after resizing
     for scenario in scenarios:
-        process_ssp_scenario_2023(scenario, model, input_path_template, output_path_template, pix_size, final_size)
+        process_ssp_scenario_2023(scenario, model, input_path_template, output_path_template, pix_size, final_size, oras5_mean,
+                                  logger=logger, verbose=verbose)
 
 if __name__ == "__main__":
-    main()
-
+    run_training_script(train, "Train the UNet SSS bias correction model", default_epochs=2000,
+                        default_bias_mean_path=BIAS_MEAN_PATH)
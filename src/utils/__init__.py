@@ -3,37 +3,34 @@ Utility functions for climate model bias correction.
 
 This package contains utility functions for data loading, preprocessing,
 evaluation, and visualization.
+
+The functions below are imported from their submodules on first use, so that
+importing a light submodule such as utils.training does not load NumPy,
+SciPy or TensorFlow.
 """
 
-from .data_loader import (
-    load_cmip6_sst_data,
-    load_oras5_sst_data,
-    load_bilstm_data,
-    load_convlstm_data,
-    load_ocean_mask,
-    load_climatology_mean
-)
+import importlib
+
+_SUBMODULES = {
+    'load_cmip6_sst_data': 'data_loader',
+    'load_oras5_sst_data': 'data_loader',
+    'load_bilstm_data': 'data_loader',
+    'load_convlstm_data': 'data_loader',
+    'load_ocean_mask': 'data_loader',
+    'load_climatology_mean': 'data_loader',
+    'data_minus_mean': 'preprocessing',
+    'data_plus_mean': 'preprocessing',
+    'channels_first': 'preprocessing',
+    'resize_data': 'preprocessing',
+    'prepare_unet_data': 'preprocessing',
+    'prepare_bilstm_data': 'preprocessing',
+    'prepare_convlstm_data': 'preprocessing'
+}
 
-from .preprocessing import (
-    data_minus_mean,
-    data_plus_mean,
-    resize_data,
-    prepare_unet_data,
-    prepare_bilstm_data,
-    prepare_convlstm_data
-)
+__all__ = list(_SUBMODULES)
 
-__all__ = [
-    'load_cmip6_sst_data',
-    'load_oras5_sst_data',
-    'load_bilstm_data',
-    'load_convlstm_data',
-    'load_ocean_mask',
-    'load_climatology_mean',
-    'data_minus_mean',
-    'data_plus_mean',
-    'resize_data',
-    'prepare_unet_data',
-    'prepare_bilstm_data',
-    'prepare_convlstm_data'
-]
+def __getattr__(name):
+    if name in _SUBMODULES:
+        module = importlib.import_module(f'.{_SUBMODULES[name]}', __name__)
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
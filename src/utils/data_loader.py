@@ -11,6 +11,26 @@ import os
 import numpy as np
 import scipy.io
 
+def load_mat_array(mat_file, key):
+    """
+    Load an array from a .mat file, preferring a memory-mapped .npy copy.
+    
+    run_correction.py writes the .npy copies next to the .mat files; if no
+    up-to-date copy exists the .mat file is read directly.
+    
+    Args:
+        mat_file (str): Path to the .mat file
+        key (str): Name of the variable inside the .mat file
+        
+    Returns:
+        numpy.ndarray: The stored array
+    """
+    npy_file = os.path.splitext(mat_file)[0] + '.npy'
+    if os.path.exists(npy_file) and (
+            not os.path.exists(mat_file) or os.path.getmtime(npy_file) >= os.path.getmtime(mat_file)):
+        return np.load(npy_file, mmap_mode='r')
+    return np.array(scipy.io.loadmat(mat_file)[key])
+
 def load_cmip6_sst_data(base_path='../data/sst/'):
     """
     Load and process CMIP6 SST data from multiple scenarios.
@@ -157,13 +177,23 @@ def load_ocean_mask(mask_path='../data/oras5_mask.mat'):
     """
     Load ocean mask for custom loss functions.
     
+    A bit-packed copy written by run_correction.py (same name with a .npz
+    extension) is used when it is at least as new as the .mat file.
+    
     Args:
         mask_path (str): Path to mask file
         
     Returns:
-        numpy.ndarray: Ocean mask (1=ocean, 0=land)
+        numpy.ndarray: Boolean ocean mask (True=ocean, False=land)
     """
-    return np.array(scipy.io.loadmat(mask_path)['mask1'])
+    packed_path = os.path.splitext(mask_path)[0] + '.npz'
+    if os.path.exists(packed_path) and (
+            not os.path.exists(mask_path) or os.path.getmtime(packed_path) >= os.path.getmtime(mask_path)):
+        with np.load(packed_path) as packed:
+            shape = tuple(packed['shape'])
+            bits = np.unpackbits(packed['bits'], count=int(np.prod(shape)))
+        return bits.reshape(shape).astype(bool)
+    return np.array(scipy.io.loadmat(mask_path)['mask1']) > 0
 
 def load_climatology_mean(base_path='../data/sst/'):
     """
@@ -24,7 +24,7 @@ def data_minus_mean(data, mean_data):
         numpy.ndarray: Normalized data
     """
     num = np.size(np.squeeze(data[:,1,1]))
-    num = num/12  # Assuming monthly data, divide by 12 to get years
+    num = num//12  # Assuming monthly data, divide by 12 to get years
     
     # Repeat mean data for each year
     mean_repeated = np.repeat(mean_data, num, 0)
@@ -44,7 +44,7 @@ def data_plus_mean(data, mean_data):
         numpy.ndarray: Data with mean added back
     """
     num = np.size(np.squeeze(data[:,1,1]))
-    num = num/12  # Assuming monthly data, divide by 12 to get years
+    num = num//12  # Assuming monthly data, divide by 12 to get years
     
     # Repeat mean data for each year
     mean_repeated = np.repeat(mean_data, num, 0)
@@ -52,9 +52,18 @@ def data_plus_mean(data, mean_data):
     # Add mean
     return data + mean_repeated
 
+def channels_first():
+    """
+    Check whether Keras is configured for (N, C, H, W) image tensors.
+    
+    Returns:
+        bool: True for channels_first, False for channels_last
+    """
+    return tf.keras.backend.image_data_format() == "channels_first"
+
 def resize_data(data, target_size):
     """
-    Resize data to target dimensions.
+    Resize (N, H, W, C) data to target dimensions in the model's data format.
     
     Args:
         data (numpy.ndarray): Input data
@@ -63,7 +72,10 @@ def resize_data(data, target_size):
     Returns:
         tensorflow.Tensor: Resized data
     """
-    return tf.image.resize(data, [target_size, target_size])
+    data = tf.image.resize(data, [target_size, target_size])
+    if channels_first():
+        data = tf.transpose(data, [0, 3, 1, 2])
+    return data
 
 def prepare_unet_data(cmip6_data, oras5_data, mean_data, target_size=128, train_size=0.8):
     """
@@ -0,0 +1,99 @@
+"""
+Training setup shared by run_correction.py and the UNet training scripts.
+
+This module provides:
+- The Keras precision policies selectable with --precision
+- GPU memory configuration
+- tf.data input pipelines for model.fit
+- The command line of the UNet training scripts
+
+TensorFlow is only imported inside the functions, so the command line tool
+can read the precision choices without loading it.
+"""
+
+# Keras mixed precision policy for each --precision choice
+PRECISION_POLICIES = {
+    "fp32": "float32",
+    "mixed_bf16": "mixed_bfloat16",
+    "mixed_fp16": "mixed_float16"
+}
+
+def configure_gpu_memory(memory_limit=None):
+    """
+    Cap GPU memory on every GPU, or let it grow on demand.
+
+    This must run before TensorFlow initialises the devices; otherwise
+    TensorFlow raises a RuntimeError.
+
+    Args:
+        memory_limit (int): Memory per GPU in MB, or None to allocate on demand
+
+    Returns:
+        list: The physical GPU devices that were configured
+    """
+    import tensorflow as tf
+
+    gpus = tf.config.list_physical_devices('GPU')
+    for gpu in gpus:
+        if memory_limit is not None:
+            tf.config.set_logical_device_configuration(
+                gpu, [tf.config.LogicalDeviceConfiguration(memory_limit=memory_limit)])
+        else:
+            tf.config.experimental.set_memory_growth(gpu, True)
+    return gpus
+
+def make_dataset(x, y, batch_size):
+    """
+    Batch in-memory inputs and labels for model.fit.
+
+    The arrays are already in memory, so batches are only prefetched, not
+    cached.
+
+    Args:
+        x (array-like): Model inputs
+        y (array-like): Target values
+        batch_size (int): Batch size
+
+    Returns:
+        tf.data.Dataset: Batched, prefetching dataset
+    """
+    import tensorflow as tf
+
+    return tf.data.Dataset.from_tensor_slices((x, y)).batch(batch_size).prefetch(tf.data.AUTOTUNE)
+
+def run_training_script(train, description, default_epochs, default_bias_mean_path):
+    """
+    Parse a UNet training script's command line and call its train function.
+
+    run_correction.py --subprocess passes its options this way.
+
+    Args:
+        train (callable): The script's train function
+        description (str): Description shown by --help
+        default_epochs (int): Number of epochs when --epochs is not given
+        default_bias_mean_path (str): Climatology file when --bias_mean_path is not given
+    """
+    import argparse
+    import tensorflow as tf
+
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--epochs", type=int, default=default_epochs, help="Number of training epochs")
+    parser.add_argument("--batch_size", type=int, default=64, help="Training batch size")
+    parser.add_argument("--load_model", action="store_true",
+                        help="Resume from an existing saved model if available")
+    parser.add_argument("--precision", choices=list(PRECISION_POLICIES), default="fp32",
+                        help="Training precision; mixed_bf16 needs Ampere+ GPUs or TPUs")
+    parser.add_argument("--gpu_mem_limit", type=int, default=None,
+                        help="Cap GPU memory per device in MB (default: grow on demand)")
+    parser.add_argument("--bias_mean_path", default=default_bias_mean_path,
+                        help="ORAS5 climatology .mat file removed before training")
+    parser.add_argument("--data_format", choices=["channels_last", "channels_first"], default="channels_last",
+                        help="Keras image data format")
+    args = parser.parse_args()
+
+    # GPU memory must be configured before TensorFlow touches the devices
+    configure_gpu_memory(args.gpu_mem_limit)
+    tf.keras.mixed_precision.set_global_policy(PRECISION_POLICIES[args.precision])
+    tf.keras.backend.set_image_data_format(args.data_format)
+    train(epochs=args.epochs, batch_size=args.batch_size, use_existing_model=args.load_model,
+          bias_mean_path=args.bias_mean_path)